@@ -8,33 +8,39 @@ the encrypted bytes written to a file, returning the file path as a string.
 """
 
 
-import sys
-import traceback
-print("[nodes.py] Importing dependencies for ComfyUI RSA nodes...")
+import functools
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 from PIL import Image
+import numpy as np
 import os
 import io
+import tempfile
+
+log = logging.getLogger("comfyui_encrypt")
+log.debug("[nodes.py] Importing dependencies for ComfyUI RSA nodes...")
 
 try:
-    from .rsa_encrypt import generate_rsa_keypair, encrypt_image
-    print("[nodes.py] Successfully imported generate_rsa_keypair, encrypt_image from .rsa_encrypt")
+    from .rsa_encrypt import generate_rsa_keypair, encrypt_bytes, encrypt_image, pack_raw_image
+    log.debug("[nodes.py] Successfully imported generate_rsa_keypair, encrypt_bytes, encrypt_image, pack_raw_image from .rsa_encrypt")
 except Exception as e:
-    print(f"[nodes.py] ImportError: {e}", file=sys.stderr)
-    traceback.print_exc()
+    log.exception("[nodes.py] ImportError: %s", e)
     raise
 
 
 class RSAEncryptNode:
     """Encrypt an input IMAGE with RSA and write the encrypted bytes to disk.
 
-    Outputs a string containing the written file path.
+    Every image of a batch is encrypted to its own file. Outputs a string
+    containing the written file path (newline-separated for batches).
     """
 
     @classmethod
     def INPUT_TYPES(cls):
-        print("[RSAEncryptNode] INPUT_TYPES called")
+        log.debug("[RSAEncryptNode] INPUT_TYPES called")
         return {
             "required": {
                 "image": ("IMAGE",),
@@ -42,6 +48,7 @@ class RSAEncryptNode:
             },
             "optional": {
                 "out_path": ("STRING",),
+                "format": (["raw", "png", "bmp"],),
             },
         }
 
@@ -56,70 +63,29 @@ class RSAEncryptNode:
         image,
         public_key_pem: str,
         out_path: Optional[str] = None,
+        format: str = "raw",
     ):
-        print(f"[RSAEncryptNode] encrypt called with out_path={out_path}")
+        log.debug("[RSAEncryptNode] encrypt called with out_path=%s, format=%s", out_path, format)
         """Encrypt an image with RSA public key.
 
         Args:
             image: ComfyUI IMAGE object (numpy array or PIL Image)
             public_key_pem: RSA public key in PEM format (as string)
             out_path: optional output file path; if not provided, writes to cwd with auto-generated name
+            format: "raw" (default) to encrypt the pixel buffer directly (fastest; decrypt with
+                rsa_encrypt.decrypt_image), "png" to encrypt a PNG file, "bmp" for an uncompressed
+                BMP file (drops alpha)
 
         Returns:
-            (file_path_str,)
+            (file_path_str,) with one path per line for batched input
         """
-        # Convert ComfyUI image input to PIL Image
-        pil_img = None
+        # Convert ComfyUI image input to a batch of uint8 arrays (or a single PIL Image)
         try:
-            import numpy as np
-            
-            # Check if it's a PyTorch Tensor
-            if hasattr(image, "numpy"):
-                print(f"[RSAEncryptNode] Detected PyTorch Tensor with shape {image.shape}, dtype {image.dtype}")
-                # Convert Tensor to numpy array
-                arr = image.numpy()
-                print(f"[RSAEncryptNode] Converted Tensor to numpy array with shape {arr.shape}, dtype {arr.dtype}")
-            elif isinstance(image, np.ndarray):
-                arr = image
-                print(f"[RSAEncryptNode] Detected numpy array with shape {arr.shape}, dtype {arr.dtype}")
-            elif hasattr(image, "convert"):
-                # It's already a PIL Image
-                pil_img = image
-                print(f"[RSAEncryptNode] Detected PIL Image")
-            else:
-                raise ValueError(f"Unsupported image type: {type(image)}")
-            
-            # If we have a numpy array, convert to PIL Image
-            if pil_img is None and arr is not None:
-                # Handle float arrays (ComfyUI typically uses float32 in range [0, 1])
-                if arr.dtype == np.float32 or arr.dtype == np.float64:
-                    print(f"[RSAEncryptNode] Converting float array to uint8 (range 0-255)")
-                    # Clamp and scale to 0-255
-                    arr = np.clip(arr * 255, 0, 255).astype(np.uint8)
-                
-                # Remove batch dimension if present (shape is (batch, height, width, channels))
-                if len(arr.shape) == 4:
-                    print(f"[RSAEncryptNode] Removing batch dimension from shape {arr.shape}")
-                    arr = arr[0]  # Take first image from batch
-                    print(f"[RSAEncryptNode] New shape after removing batch: {arr.shape}")
-                
-                # Handle different array shapes
-                if len(arr.shape) == 3:
-                    if arr.shape[2] == 4:  # RGBA
-                        pil_img = Image.fromarray(arr, mode='RGBA')
-                    elif arr.shape[2] == 3:  # RGB
-                        pil_img = Image.fromarray(arr, mode='RGB')
-                    else:
-                        raise ValueError(f"Unsupported number of channels: {arr.shape[2]}")
-                elif len(arr.shape) == 2:  # Grayscale
-                    pil_img = Image.fromarray(arr, mode='L')
-                else:
-                    raise ValueError(f"Unsupported array shape: {arr.shape}")
-                
-                print(f"[RSAEncryptNode] Converted array to PIL Image: {pil_img.size}, mode {pil_img.mode}")
+            pixels = _to_uint8_hwc(image)
+            if isinstance(pixels, np.ndarray):
+                _image_mode(pixels[0])  # validate shape (shared by the whole batch) before starting any work
         except Exception as e:
-            print(f"[RSAEncryptNode] Exception in image conversion: {e}", file=sys.stderr)
-            traceback.print_exc()
+            log.exception("[RSAEncryptNode] Exception in image conversion: %s", e)
             raise ValueError(f"Unsupported image input: {e}")
 
         # Convert public key string to bytes
@@ -130,98 +96,223 @@ class RSAEncryptNode:
 
         # Encrypt
         try:
-            enc_bytes = encrypt_image(pil_img, public_key_pem_bytes)
+            if isinstance(pixels, Image.Image):
+                encrypted = [encrypt_image(pixels, public_key_pem_bytes, format=format)]
+            elif len(pixels) == 1:
+                encrypted = [_encrypt_one(pixels[0], public_key_pem_bytes, format)]
+            else:
+                # AES and PNG encoding release the GIL, so batch images encrypt in parallel
+                workers = min(len(pixels), os.cpu_count() or 1)
+                log.debug("[RSAEncryptNode] Encrypting batch of %s images with %s workers", len(pixels), workers)
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    encrypted = list(pool.map(
+                        _encrypt_one, pixels, itertools.repeat(public_key_pem_bytes), itertools.repeat(format)
+                    ))
         except Exception as e:
-            print(f"[RSAEncryptNode] Error in encrypt_image: {e}", file=sys.stderr)
-            traceback.print_exc()
+            log.exception("[RSAEncryptNode] Error in encrypt_image: %s", e)
             raise
 
-        # Determine output path
-        def _expand_placeholders(s: str) -> str:
-            """Expand %date:FORMAT% placeholders into actual date strings.
-
-            Supported tokens inside FORMAT: yyyy, yy, MM, dd, hhmmss, hh, mm, ss
-            Example: %date:yyyy-MM-dd% -> 2025-11-15
-            """
-            import re
-            from datetime import datetime
-
-            def _conv(fmt: str) -> str:
-                # map common tokens to Python strftime
-                fmt = fmt.replace('yyyy', '%Y')
-                fmt = fmt.replace('yy', '%y')
-                fmt = fmt.replace('MM', '%m')
-                fmt = fmt.replace('dd', '%d')
-                fmt = fmt.replace('hhmmss', '%H%M%S')
-                fmt = fmt.replace('hh', '%H')
-                fmt = fmt.replace('mm', '%M')
-                fmt = fmt.replace('ss', '%S')
-                return fmt
-
-            def repl(m: re.Match) -> str:
-                inner = m.group(1)
-                try:
-                    pyfmt = _conv(inner)
-                    return datetime.now().strftime(pyfmt)
-                except Exception:
-                    return m.group(0)
-
-            return re.sub(r"%date:([^%]+)%", repl, s)
-
-        target = None
-        if out_path:
-            expanded = _expand_placeholders(out_path)
-            # If user provided a relative placeholder path, place it under ComfyUI 'output' dir
-            p = Path(expanded)
-            if not p.is_absolute():
-                p = Path(os.getcwd()) / 'ComfyUI/output' / p
-
-            # If p looks like a directory (ends with separator) or has no suffix, treat as base name and create unique file
-            if str(expanded).endswith(os.sep) or p.suffix == '':
-                base_dir = p
-                # if there's a basename with no suffix, separate parent and name
-                if p.name and p.suffix == '':
-                    base_dir = p.parent
-                    base_name = p.name
-                else:
-                    base_name = 'encrypted_image'
-
-                base_dir.mkdir(parents=True, exist_ok=True)
-                i = 0
-                while True:
-                    candidate = base_dir / f"{base_name}_{i}.rsa"
-                    if not candidate.exists():
-                        target = candidate
-                        break
-                    i += 1
-            else:
-                # Ensure parent exists
-                p.parent.mkdir(parents=True, exist_ok=True)
-                target = p
-        else:
-            base = Path(os.getcwd()) / "encrypted_image"
-            i = 0
-            while True:
-                candidate = base.with_name(f"encrypted_image_{i}.rsa")
-                if not candidate.exists():
-                    target = candidate
-                    break
-                i += 1
-
-        # Ensure parent dir exists
-        target.parent.mkdir(parents=True, exist_ok=True)
-
-        # Write encrypted data
+        # Write encrypted data, one file per image
+        paths = []
+        for i, enc_bytes in enumerate(encrypted):
+            try:
+                target, f = _open_target(out_path, i if len(encrypted) > 1 else None)
+                with f:
+                    f.write(enc_bytes)
+                log.debug("[RSAEncryptNode] Encrypted image written to %s", target)
+            except Exception as e:
+                log.exception("[RSAEncryptNode] Error writing encrypted file: %s", e)
+                raise
+            paths.append(str(target))
+
+        return ("\n".join(paths),)
+
+
+@functools.singledispatch
+def _to_uint8_hwc(image):
+    """Convert a ComfyUI IMAGE input to uint8 pixels.
+
+    Dispatches on the input type. Returns a uint8 array shaped
+    (batch, height, width[, channels]), or the image itself for PIL input.
+    """
+    raise TypeError(f"Unsupported image type: {type(image)}")
+
+
+@_to_uint8_hwc.register
+def _(image: np.ndarray):
+    arr = image
+    log.debug("[RSAEncryptNode] Detected numpy array with shape %s, dtype %s", arr.shape, arr.dtype)
+    # Handle float arrays (ComfyUI typically uses float32 in range [0, 1])
+    if np.issubdtype(arr.dtype, np.floating):
+        log.debug("[RSAEncryptNode] Converting float array to uint8 (range 0-255)")
+        # Clamp and scale to 0-255
+        arr = np.clip(arr * 255, 0, 255).astype(np.uint8)
+    elif arr.dtype != np.uint8:
+        # The raw format packs the buffer as-is, so other dtypes must not get through
+        raise TypeError(f"Cannot handle this data type: {arr.dtype}")
+
+    # Treat everything as a batch (shape is (batch, height, width[, channels]))
+    if len(arr.shape) in (2, 3):
+        arr = arr[None]
+    return arr
+
+
+@_to_uint8_hwc.register
+def _(image: Image.Image):
+    log.debug("[RSAEncryptNode] Detected PIL Image")
+    return image
+
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+if torch is not None:
+    @_to_uint8_hwc.register
+    def _(image: torch.Tensor):
+        log.debug("[RSAEncryptNode] Detected PyTorch Tensor with shape %s, dtype %s", image.shape, image.dtype)
+        tensor = image.detach()
+        # Scale/clamp/cast inside torch (on the tensor's device) instead of in NumPy
+        if tensor.dtype.is_floating_point:
+            tensor = tensor.mul(255).clamp_(0, 255).to(torch.uint8)
+        arr = tensor.contiguous().cpu().numpy()
+        log.debug("[RSAEncryptNode] Converted Tensor to numpy array with shape %s, dtype %s", arr.shape, arr.dtype)
+        return _to_uint8_hwc(arr)
+
+
+def _image_mode(arr) -> str:
+    """Return the PIL mode for a uint8 (height, width[, channels]) array."""
+    # Image.frombuffer and the raw format take the buffer as-is, so any other
+    # dtype would be reinterpreted byte by byte
+    if arr.dtype != np.uint8:
+        raise TypeError(f"Cannot handle this data type: {arr.dtype}")
+    if len(arr.shape) == 3:
+        if arr.shape[2] == 4:  # RGBA
+            return 'RGBA'
+        if arr.shape[2] == 3:  # RGB
+            return 'RGB'
+        raise ValueError(f"Unsupported number of channels: {arr.shape[2]}")
+    if len(arr.shape) == 2:  # Grayscale
+        return 'L'
+    raise ValueError(f"Unsupported array shape: {arr.shape}")
+
+
+def _encrypt_one(arr, public_key_pem: bytes, format: str = "raw") -> bytes:
+    """Encrypt a single uint8 image array."""
+    mode = _image_mode(arr)
+    arr = np.ascontiguousarray(arr)
+    if format == "raw":
+        # Skip PIL and PNG entirely: header + pixel buffer, copied once into
+        # the payload straight from the array (no intermediate tobytes())
+        raw_data = pack_raw_image(mode, (arr.shape[1], arr.shape[0]), memoryview(arr))
+        return encrypt_bytes(raw_data, public_key_pem)
+    # Wrap the array's buffer instead of copying it (Pillow shares memory for
+    # L/RGBA; RGB is unpacked to its 4-byte internal layout either way).
+    # arr stays referenced until encrypt_image returns.
+    pil_img = Image.frombuffer(mode, (arr.shape[1], arr.shape[0]), arr, 'raw', mode, 0, 1)
+    return encrypt_image(pil_img, public_key_pem, format=format)
+
+
+def _expand_placeholders(s: str) -> str:
+    """Expand %date:FORMAT% placeholders into actual date strings.
+
+    Supported tokens inside FORMAT: yyyy, yy, MM, dd, hhmmss, hh, mm, ss
+    Example: %date:yyyy-MM-dd% -> 2025-11-15
+    """
+    import re
+    from datetime import datetime
+
+    def _conv(fmt: str) -> str:
+        # map common tokens to Python strftime
+        fmt = fmt.replace('yyyy', '%Y')
+        fmt = fmt.replace('yy', '%y')
+        fmt = fmt.replace('MM', '%m')
+        fmt = fmt.replace('dd', '%d')
+        fmt = fmt.replace('hhmmss', '%H%M%S')
+        fmt = fmt.replace('hh', '%H')
+        fmt = fmt.replace('mm', '%M')
+        fmt = fmt.replace('ss', '%S')
+        return fmt
+
+    def repl(m: re.Match) -> str:
+        inner = m.group(1)
         try:
-            with open(target, "wb") as f:
-                f.write(enc_bytes)
-            print(f"[RSAEncryptNode] Encrypted image written to {target}")
-        except Exception as e:
-            print(f"[RSAEncryptNode] Error writing encrypted file: {e}", file=sys.stderr)
-            traceback.print_exc()
-            raise
+            pyfmt = _conv(inner)
+            return datetime.now().strftime(pyfmt)
+        except Exception:
+            return m.group(0)
+
+    return re.sub(r"%date:([^%]+)%", repl, s)
+
+
+def _open_target(out_path: Optional[str], index: Optional[int] = None):
+    """Open the output file for one encrypted image.
+
+    Without out_path, the file is created in cwd by `tempfile.mkstemp`, which
+    picks a unique name atomically (O_EXCL) instead of probing numbered names.
+
+    Args:
+        out_path: the node's out_path input (may be empty)
+        index: position in the batch when encrypting several images
+
+    Returns:
+        (path, binary file object opened for writing)
+    """
+    if out_path:
+        target = _resolve_target(out_path, index)
+        return target, open(target, "wb")
+    fd, path = tempfile.mkstemp(prefix="encrypted_image_", suffix=".rsa", dir=os.getcwd())
+    return Path(path), os.fdopen(fd, "wb")
+
 
-        return (str(target),)
+def _resolve_target(out_path: str, index: Optional[int] = None) -> Path:
+    """Pick the output file for one encrypted image when out_path is given.
+
+    Args:
+        out_path: the node's out_path input
+        index: position in the batch when encrypting several images; an explicit
+            file name then gets an ``_{index}`` suffix so batch outputs don't collide
+
+    Returns:
+        output path whose parent directory exists
+    """
+    expanded = _expand_placeholders(out_path)
+    # If user provided a relative placeholder path, place it under ComfyUI 'output' dir
+    p = Path(expanded)
+    if not p.is_absolute():
+        p = Path(os.getcwd()) / 'ComfyUI/output' / p
+
+    # If p looks like a directory (ends with separator) or has no suffix, treat as base name and create unique file
+    if str(expanded).endswith(os.sep) or p.suffix == '':
+        base_dir = p
+        # if there's a basename with no suffix, separate parent and name
+        if p.name and p.suffix == '':
+            base_dir = p.parent
+            base_name = p.name
+        else:
+            base_name = 'encrypted_image'
+
+        base_dir.mkdir(parents=True, exist_ok=True)
+        i = 0
+        while True:
+            candidate = base_dir / f"{base_name}_{i}.rsa"
+            if not candidate.exists():
+                target = candidate
+                break
+            i += 1
+    else:
+        if index is not None:
+            p = p.with_name(f"{p.stem}_{index}{p.suffix}")
+        target = p
+
+    # Ensure parent dir exists
+    target.parent.mkdir(parents=True, exist_ok=True)
+    return target
+
+
+# Most recent keypair per key size, for RSAKeyGeneratorNode's reuse option
+_key_cache = {}
 
 
 class RSAKeyGeneratorNode:
@@ -229,7 +320,7 @@ class RSAKeyGeneratorNode:
 
     @classmethod
     def INPUT_TYPES(cls):
-        print("[RSAKeyGeneratorNode] INPUT_TYPES called")
+        log.debug("[RSAKeyGeneratorNode] INPUT_TYPES called")
         return {
             "required": {
                 "key_size": (["2048", "4096"],),
@@ -237,6 +328,7 @@ class RSAKeyGeneratorNode:
             "optional": {
                 "private_key_path": ("STRING",),
                 "public_key_path": ("STRING",),
+                "reuse": ("BOOLEAN", {"default": False}),
             },
         }
 
@@ -251,46 +343,53 @@ class RSAKeyGeneratorNode:
         key_size: str,
         private_key_path: Optional[str] = None,
         public_key_path: Optional[str] = None,
+        reuse: bool = False,
     ):
-        print(f"[RSAKeyGeneratorNode] generate called with key_size={key_size}, private_key_path={private_key_path}, public_key_path={public_key_path}")
+        log.debug("[RSAKeyGeneratorNode] generate called with key_size=%s, private_key_path=%s, public_key_path=%s, reuse=%s", key_size, private_key_path, public_key_path, reuse)
         """Generate RSA keypair.
 
         Args:
             key_size: "2048" or "4096"
             private_key_path: optional path to save private key
             public_key_path: optional path to save public key
+            reuse: return the keypair generated earlier in this process for the
+                same key size instead of generating a new one
 
         Returns:
             (private_key_pem_str, public_key_pem_str)
         """
         try:
             size = int(key_size)
-            private_pem, public_pem = generate_rsa_keypair(key_size=size)
+            if reuse and size in _key_cache:
+                private_pem, public_pem = _key_cache[size]
+                log.debug("[RSAKeyGeneratorNode] Reusing cached %s-bit keypair", size)
+            else:
+                private_pem, public_pem = generate_rsa_keypair(key_size=size)
+                _key_cache[size] = (private_pem, public_pem)
 
             # Save if paths provided
             if private_key_path:
                 Path(private_key_path).parent.mkdir(parents=True, exist_ok=True)
                 with open(private_key_path, "wb") as f:
                     f.write(private_pem)
-                print(f"[RSAKeyGeneratorNode] Private key written to {private_key_path}")
+                log.debug("[RSAKeyGeneratorNode] Private key written to %s", private_key_path)
 
             if public_key_path:
                 Path(public_key_path).parent.mkdir(parents=True, exist_ok=True)
                 with open(public_key_path, "wb") as f:
                     f.write(public_pem)
-                print(f"[RSAKeyGeneratorNode] Public key written to {public_key_path}")
+                log.debug("[RSAKeyGeneratorNode] Public key written to %s", public_key_path)
 
             # Return as strings
             return (private_pem.decode("utf-8"), public_pem.decode("utf-8"))
         except Exception as e:
-            print(f"[RSAKeyGeneratorNode] Error in generate: {e}", file=sys.stderr)
-            traceback.print_exc()
+            log.exception("[RSAKeyGeneratorNode] Error in generate: %s", e)
             raise
 
 
 # Expose node classes in the same pattern as ComfyUI-NodeSample so the
 # ComfyUI loader can discover and register them.
-print("[nodes.py] Registering NODE_CLASS_MAPPINGS and NODE_DISPLAY_NAME_MAPPINGS")
+log.debug("[nodes.py] Registering NODE_CLASS_MAPPINGS and NODE_DISPLAY_NAME_MAPPINGS")
 NODE_CLASS_MAPPINGS = {
     "RSAEncryptNode": RSAEncryptNode,
     "RSAKeyGeneratorNode": RSAKeyGeneratorNode,
@@ -300,4 +399,4 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "RSAEncryptNode": "RSA Encrypt Image",
     "RSAKeyGeneratorNode": "RSA Key Generator",
 }
-print("[nodes.py] NODE_CLASS_MAPPINGS and NODE_DISPLAY_NAME_MAPPINGS registered")
+log.debug("[nodes.py] NODE_CLASS_MAPPINGS and NODE_DISPLAY_NAME_MAPPINGS registered")
@@ -1,23 +1,63 @@
 """RSA encryption utilities for images and bytes.
 
 Uses the cryptography library to handle RSA public key encryption with AES for large data.
-For data larger than RSA key can handle directly, uses hybrid encryption (RSA + AES).
+For data larger than RSA key can handle directly, uses hybrid encryption (RSA + AES-GCM).
+AES-GCM goes through OpenSSL's EVP interface, so AES-NI/CLMUL are used transparently
+when the CPU supports them.
 
-Supports key generation, encryption of raw bytes, and image encryption (as PNG).
+Supports key generation, encryption of raw bytes, and image encryption (as PNG or BMP,
+or as raw pixels with a small header when both ends use this module).
 """
 
 from typing import Optional, Union, Tuple
 from pathlib import Path
-from io import BytesIO
+from io import BytesIO, RawIOBase
+import PIL
 from PIL import Image
+import struct
 
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
+from cryptography.exceptions import InvalidTag
+import asyncio
+import contextlib
+import functools
+import logging
+import mmap
 import os
 
 
+log = logging.getLogger("comfyui_encrypt")
+
+# Header identifying the RSA + AES-GCM layout; files from the older AES-CBC
+# layout do not start with it and are rejected by decrypt_bytes.
+_MAGIC = b"RSAG"
+_NONCE_SIZE = 12  # 96-bit GCM nonce
+_TAG_SIZE = 16
+_UPDATE_CHUNK = 1 << 20  # bytes per cipher update() call
+
+# Chunked layout written by encrypt_file: magic + RSA-encrypted AES key +
+# 4-byte nonce prefix, then frames of <uint32 length|final bit> + ciphertext
+# and tag. Frame i uses nonce prefix || uint64 i; the final frame is bound
+# by its associated data so truncation is detected.
+_STREAM_MAGIC = b"RSAS"
+_STREAM_PREFIX_SIZE = 4
+_STREAM_CHUNK = 4 << 20
+_FRAME_HEADER = struct.Struct("<I")
+_FINAL_BIT = 1 << 31
+_MMAP_MIN_SIZE = 1 << 16  # smaller inputs are read() into memory instead
+
+# OAEP parameters used to wrap the AES key (immutable, shared by all calls)
+_OAEP = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None
+)
+
+
 def generate_rsa_keypair(key_size: int = 2048) -> Tuple[bytes, bytes]:
     """Generate an RSA keypair (private and public keys in PEM format).
 
@@ -48,50 +88,84 @@ def generate_rsa_keypair(key_size: int = 2048) -> Tuple[bytes, bytes]:
     return private_pem, public_pem
 
 
+@functools.lru_cache(maxsize=16)
+def _load_public_key(public_key_pem: bytes):
+    """Parse a PEM public key, reusing the parsed object for repeated keys."""
+    return serialization.load_pem_public_key(public_key_pem, backend=default_backend())
+
+
+@functools.lru_cache(maxsize=16)
+def _load_private_key(private_key_pem: bytes):
+    """Parse an unencrypted PEM private key, reusing the parsed object for repeated keys."""
+    return serialization.load_pem_private_key(
+        private_key_pem, password=None, backend=default_backend()
+    )
+
+
+def _update_chunked(ctx, data) -> list:
+    """Feed data to a cipher context in 1 MB slices and return the outputs.
+
+    OpenSSL releases the GIL per update() call; bounding each call keeps
+    other threads (e.g. the ComfyUI server) responsive during big payloads.
+    Slices are memoryviews, so the input is not copied.
+    """
+    view = memoryview(data)
+    return [ctx.update(view[i:i + _UPDATE_CHUNK]) for i in range(0, len(view), _UPDATE_CHUNK)]
+
+
+def _new_session(
+    public_key_pem: bytes,
+    magic: bytes = _MAGIC,
+    nonce_size: int = _NONCE_SIZE,
+) -> Tuple[bytes, bytes, bytes]:
+    """Create a fresh AES key and nonce for one encryption.
+
+    Args:
+        public_key_pem: public key in PEM format (bytes)
+        magic: format tag to start the header with
+        nonce_size: number of random nonce bytes to generate
+
+    Returns:
+        (header, aes_key, nonce) where header is magic + RSA-encrypted AES key + nonce
+    """
+    public_key = _load_public_key(bytes(public_key_pem))
+
+    # Generate random AES key (256-bit for AES-256) and nonce from a single draw
+    rnd = os.urandom(32 + nonce_size)
+    aes_key, nonce = rnd[:32], rnd[32:]
+
+    # Encrypt the AES key with RSA
+    encrypted_aes_key = public_key.encrypt(aes_key, _OAEP)
+
+    return b"".join((magic, encrypted_aes_key, nonce)), aes_key, nonce
+
+
 def encrypt_bytes(
     data: bytes,
     public_key_pem: bytes,
 ) -> bytes:
     """Encrypt raw bytes with RSA public key using hybrid encryption (AES + RSA).
 
-    For data larger than RSA can directly encrypt, uses AES-256-CBC symmetric encryption
-    with the symmetric key encrypted via RSA. This allows encrypting arbitrarily large files.
+    For data larger than RSA can directly encrypt, uses AES-256-GCM symmetric encryption
+    with the symmetric key encrypted via RSA. This allows encrypting arbitrarily large files,
+    and the GCM tag lets `decrypt_bytes` detect tampering.
 
     Args:
         data: bytes to encrypt
         public_key_pem: public key in PEM format (bytes)
 
     Returns:
-        encrypted bytes (format: 256 bytes of RSA-encrypted AES key + IV + AES-CBC encrypted data)
+        encrypted bytes (format: magic + RSA-encrypted AES key + nonce + AES-GCM ciphertext and tag)
     """
-    public_key = serialization.load_pem_public_key(public_key_pem, backend=default_backend())
-
-    # Generate random AES key and IV
-    aes_key = os.urandom(32)  # 256-bit key for AES-256
-    iv = os.urandom(16)  # 128-bit IV
-
-    # Encrypt the AES key with RSA
-    encrypted_aes_key = public_key.encrypt(
-        aes_key,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
+    header, aes_key, nonce = _new_session(public_key_pem)
 
-    # Encrypt the data with AES-256-CBC
-    cipher = Cipher(algorithms.AES(aes_key), modes.CBC(iv), backend=default_backend())
-    encryptor = cipher.encryptor()
+    # Encrypt the data with AES-256-GCM (ciphertext with the 16-byte tag appended)
+    encryptor = Cipher(algorithms.AES(aes_key), modes.GCM(nonce), backend=default_backend()).encryptor()
+    chunks = _update_chunked(encryptor, data)
+    tail = encryptor.finalize()
 
-    # Add PKCS7 padding to data
-    padding_length = 16 - (len(data) % 16)
-    padded_data = data + bytes([padding_length] * padding_length)
-
-    encrypted_data = encryptor.update(padded_data) + encryptor.finalize()
-
-    # Combine: RSA-encrypted AES key + IV + AES-encrypted data
-    return encrypted_aes_key + iv + encrypted_data
+    # Single exact-size allocation for the combined output
+    return b"".join([header, *chunks, tail, encryptor.tag])
 
 
 def decrypt_bytes(
@@ -101,84 +175,234 @@ def decrypt_bytes(
     """Decrypt RSA+AES-encrypted bytes with private key.
 
     Args:
-        encrypted_data: encrypted bytes (RSA-encrypted AES key + IV + AES-CBC encrypted data)
+        encrypted_data: encrypted bytes or other buffer, e.g. an mmap (magic + RSA-encrypted
+            AES key + nonce + AES-GCM ciphertext and tag)
         private_key_pem: private key in PEM format (bytes)
 
     Returns:
         decrypted bytes
+
+    Raises:
+        ValueError: if the data was not produced by `encrypt_bytes` (e.g. the
+            older AES-CBC layout)
+        cryptography.exceptions.InvalidTag: if the data was modified
     """
-    private_key = serialization.load_pem_private_key(
-        private_key_pem, password=None, backend=default_backend()
-    )
+    if encrypted_data[:len(_MAGIC)] != _MAGIC:
+        raise ValueError("unrecognised encrypted data format (missing header)")
+
+    private_key = _load_private_key(bytes(private_key_pem))
 
     # Detect RSA key size from the key
     key_bits = private_key.key_size
     key_size = key_bits // 8  # Convert bits to bytes
 
-    iv_size = 16
-
-    encrypted_aes_key = encrypted_data[:key_size]
-    iv = encrypted_data[key_size:key_size + iv_size]
-    ciphertext = encrypted_data[key_size + iv_size:]
+    # Slice through a memoryview so the ciphertext (possibly an mmap) isn't copied
+    view = memoryview(encrypted_data)
+    offset = len(_MAGIC)
+    encrypted_aes_key = bytes(view[offset:offset + key_size])
+    offset += key_size
+    nonce = bytes(view[offset:offset + _NONCE_SIZE])
+    ciphertext = view[offset + _NONCE_SIZE:]
 
     # Decrypt the AES key with RSA
-    aes_key = private_key.decrypt(
-        encrypted_aes_key,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
+    aes_key = private_key.decrypt(encrypted_aes_key, _OAEP)
+
+    # Decrypt and authenticate the data with AES-256-GCM (finalize checks the tag)
+    if len(ciphertext) < _TAG_SIZE:
+        raise InvalidTag()
+    tag = bytes(ciphertext[-_TAG_SIZE:])
+    decryptor = Cipher(algorithms.AES(aes_key), modes.GCM(nonce, tag), backend=default_backend()).decryptor()
+    chunks = _update_chunked(decryptor, ciphertext[:-_TAG_SIZE])
+    chunks.append(decryptor.finalize())
+    return b"".join(chunks)
 
-    # Decrypt the data with AES-256-CBC
-    cipher = Cipher(algorithms.AES(aes_key), modes.CBC(iv), backend=default_backend())
-    decryptor = cipher.decryptor()
-    padded_plaintext = decryptor.update(ciphertext) + decryptor.finalize()
 
-    # Remove PKCS7 padding
-    padding_length = padded_plaintext[-1]
-    plaintext = padded_plaintext[:-padding_length]
+# Raw image container: b"CFE1", mode id, width, height, then the pixels.
+# AES-GCM already authenticates the payload, so no extra checksum is needed.
+_RAW_MAGIC = b"CFE1"
+_RAW_HEADER = struct.Struct("<4sBII")
+_MODE_ID = {"L": 1, "RGB": 3, "RGBA": 4}  # id == bytes per pixel
+_MODE_BY_ID = {v: k for k, v in _MODE_ID.items()}
 
-    return plaintext
 
+def pack_raw_image(mode: str, size: Tuple[int, int], pixels) -> bytes:
+    """Prefix raw pixel bytes with the header understood by `decrypt_image`.
+
+    Args:
+        mode: PIL mode of the pixels ("L", "RGB" or "RGBA")
+        size: (width, height) in pixels
+        pixels: packed uint8 pixel data, row-major; any C-contiguous
+            bytes-like object (e.g. a memoryview of a NumPy array), which is
+            copied once into the result
 
-def _ensure_bytes(obj: Union[bytes, Image.Image]) -> bytes:
-    """Convert PIL Image or raw bytes to bytes (PNG format for images)."""
+    Returns:
+        header + pixels
+    """
+    if mode not in _MODE_ID:
+        raise ValueError(f"unsupported raw image mode: {mode}")
+    width, height = size
+    return b"".join((_RAW_HEADER.pack(_RAW_MAGIC, _MODE_ID[mode], width, height), pixels))
+
+
+def _unpack_raw_image(data: bytes) -> Optional[Image.Image]:
+    """Rebuild an image written by `pack_raw_image`, or None if data is not raw."""
+    if data[:len(_RAW_MAGIC)] != _RAW_MAGIC or len(data) < _RAW_HEADER.size:
+        return None
+    _, mode_id, width, height = _RAW_HEADER.unpack_from(data)
+    mode = _MODE_BY_ID.get(mode_id)
+    if mode is None:
+        raise ValueError(f"unknown raw image mode id: {mode_id}")
+    pixels = memoryview(data)[_RAW_HEADER.size:]
+    if len(pixels) != width * height * _MODE_ID[mode]:
+        raise ValueError("raw image size does not match its header")
+    return Image.frombuffer(mode, (width, height), pixels, "raw", mode, 0, 1)
+
+
+# PIL save() arguments per image format. The payload is encrypted right
+# afterwards, so PNG uses the fastest zlib level: ciphertext doesn't compress
+# and a better ratio only costs time. BMP skips compression altogether.
+_SAVE_PARAMS = {
+    "png": {"format": "PNG", "compress_level": 1, "optimize": False},
+    "bmp": {"format": "BMP"},
+}
+
+
+def _ensure_bytes(obj: Union[bytes, Image.Image], format: str = "raw") -> bytes:
+    """Convert raw bytes, or a PIL Image in raw format, to bytes.
+
+    Images are packed as a small header followed by the pixel buffer.
+    PNG/BMP output is never buffered here: `encrypt_image` streams the
+    encoder straight into the cipher instead.
+    """
     if isinstance(obj, bytes):
         return obj
     if isinstance(obj, Image.Image):
-        buf = BytesIO()
-        obj.save(buf, format="PNG")
-        return buf.getvalue()
+        if format != "raw":
+            raise ValueError(f"unsupported image format: {format}")
+        if obj.mode not in _MODE_ID:
+            obj = obj.convert("RGBA" if "A" in obj.getbands() else "RGB")
+        return pack_raw_image(obj.mode, obj.size, obj.tobytes())
     raise TypeError("input must be bytes or PIL.Image.Image")
 
 
+@functools.lru_cache(maxsize=None)
+def _check_pillow_simd() -> None:
+    """Log a hint once per process when images are encoded with stock Pillow.
+
+    Pillow-SIMD (a drop-in replacement, versioned like "9.5.0.post1") ships
+    SSE4/AVX2 builds of the codecs and filters used by PNG/BMP encoding.
+    This is only a speed hint, so it goes to the log at INFO level.
+    """
+    if ".post" not in PIL.__version__:
+        log.info(
+            "Pillow-SIMD is not installed; PNG/BMP encryption can be faster with it "
+            "(see the README before replacing Pillow in a shared environment) "
+            "or with format=\"raw\""
+        )
+
+
+class _EncryptSink(RawIOBase):
+    """Write-only stream that encrypts everything written to it.
+
+    Lets PIL's encoder feed the AES-GCM encryptor chunk by chunk instead of
+    first materialising the whole encoded image.
+    """
+
+    def __init__(self, encryptor):
+        self._encryptor = encryptor
+        self.chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self.chunks.append(self._encryptor.update(b))
+        return len(b)
+
+
 def encrypt_image(
     img: Union[bytes, Image.Image],
     public_key_pem: bytes,
+    format: str = "png",
 ) -> bytes:
     """Encrypt an image with RSA public key.
 
     The image is saved as PNG before encryption to preserve transparency.
+    Use format="bmp" for an uncompressed image file (no transparency), or format="raw" to
+    encrypt the pixel buffer directly when the file will be decrypted with
+    `decrypt_image`; both avoid the PNG encode cost.
 
     Args:
         img: PIL Image or raw bytes
         public_key_pem: public key in PEM format (bytes)
+        format: "png" (default), "bmp" or "raw"
 
     Returns:
         encrypted bytes
     """
-    data = _ensure_bytes(img)
+    if isinstance(img, Image.Image) and format in _SAVE_PARAMS:
+        _check_pillow_simd()
+        # Stream the image encoder straight into AES-GCM
+        header, aes_key, nonce = _new_session(public_key_pem)
+        encryptor = Cipher(algorithms.AES(aes_key), modes.GCM(nonce), backend=default_backend()).encryptor()
+        sink = _EncryptSink(encryptor)
+        img.save(sink, **_SAVE_PARAMS[format])
+        tail = encryptor.finalize()
+        return b"".join([header, *sink.chunks, tail, encryptor.tag])
+
+    data = _ensure_bytes(img, format=format)
     return encrypt_bytes(data, public_key_pem)
 
 
+def encrypt_image_raw(
+    img: Image.Image,
+    public_key_pem: bytes,
+) -> bytes:
+    """Encrypt an image's pixels in the raw container, skipping PNG encoding.
+
+    Use when the file will be decrypted by this package (`decrypt_image_raw`
+    or `decrypt_image`). Same as `encrypt_image(img, public_key_pem, format="raw")`.
+
+    Args:
+        img: PIL Image (converted to RGB/RGBA unless L, RGB or RGBA)
+        public_key_pem: public key in PEM format (bytes)
+
+    Returns:
+        encrypted bytes
+    """
+    return encrypt_image(img, public_key_pem, format="raw")
+
+
+def decrypt_image_raw(
+    encrypted_data: bytes,
+    private_key_pem: bytes,
+) -> Image.Image:
+    """Decrypt an image written by `encrypt_image_raw`.
+
+    Args:
+        encrypted_data: encrypted image bytes
+        private_key_pem: private key in PEM format (bytes)
+
+    Returns:
+        PIL Image
+
+    Raises:
+        ValueError: if the payload is not a raw image container
+    """
+    img = _unpack_raw_image(decrypt_bytes(encrypted_data, private_key_pem))
+    if img is None:
+        raise ValueError("encrypted data does not contain a raw image")
+    return img
+
+
 def decrypt_image(
     encrypted_data: bytes,
     private_key_pem: bytes,
 ) -> Image.Image:
     """Decrypt an RSA-encrypted image and return as PIL Image.
 
+    PNG/BMP-encoded and raw (`format="raw"`) payloads are all recognised.
+
     Args:
         encrypted_data: encrypted image bytes
         private_key_pem: private key in PEM format (bytes)
@@ -187,9 +411,211 @@ def decrypt_image(
         PIL Image
     """
     data = decrypt_bytes(encrypted_data, private_key_pem)
+    img = _unpack_raw_image(data)
+    if img is not None:
+        return img
     return Image.open(BytesIO(data))
 
 
+def _frame_nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + index.to_bytes(8, "big")
+
+
+def _frame_aad(final: bool) -> bytes:
+    return b"\x01" if final else b"\x00"
+
+
+@contextlib.contextmanager
+def _replacing(out_path: str):
+    """Open a temporary file next to out_path and move it there on success.
+
+    out_path itself is only touched once the caller's block has completed,
+    so it may name the input file (in-place use), and a failed run leaves an
+    existing out_path as it was. Enter this before opening the input so the
+    input is closed again before it gets replaced.
+    """
+    tmp_path = f"{out_path}.{os.urandom(4).hex()}.tmp"
+    try:
+        with open(tmp_path, "xb") as dst:
+            yield dst
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
+
+@contextlib.contextmanager
+def _mapped(f):
+    """Map an open file read-only and yield a memoryview of its contents.
+
+    Pages are read lazily by the kernel as the view is consumed, one chunk
+    at a time, instead of the whole input being read into the heap up front.
+    The file must not be truncated while mapped (that raises SIGBUS), which
+    is why outputs go through `_replacing`. Small files are simply read.
+    """
+    if os.fstat(f.fileno()).st_size < _MMAP_MIN_SIZE:
+        # Not worth a mapping (and mmap cannot map empty files)
+        yield memoryview(f.read())
+        return
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    view = memoryview(mm)
+    try:
+        yield view
+    finally:
+        view.release()
+        try:
+            mm.close()
+        except BufferError:
+            # A slice is still referenced (e.g. by a worker thread after an
+            # error); the mapping is released together with that reference.
+            pass
+
+
+async def _run_pipeline(read, transform, write) -> None:
+    """Run read -> transform -> write as three overlapping stages.
+
+    Each stage runs its blocking work in a worker thread and hands items to
+    the next through a two-slot queue, so reading chunk k+1, encrypting
+    chunk k and writing chunk k-1 happen at the same time. `read` returns
+    None once the input is exhausted.
+    """
+    to_transform = asyncio.Queue(maxsize=2)
+    to_write = asyncio.Queue(maxsize=2)
+
+    async def read_stage():
+        while True:
+            item = await asyncio.to_thread(read)
+            await to_transform.put(item)
+            if item is None:
+                return
+
+    async def transform_stage():
+        while True:
+            item = await to_transform.get()
+            if item is None:
+                await to_write.put(None)
+                return
+            await to_write.put(await asyncio.to_thread(transform, item))
+
+    async def write_stage():
+        while True:
+            item = await to_write.get()
+            if item is None:
+                return
+            await asyncio.to_thread(write, item)
+
+    tasks = [asyncio.ensure_future(stage()) for stage in (read_stage, transform_stage, write_stage)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def encrypt_file_async(
+    in_path: str,
+    out_path: str,
+    public_key_pem: bytes,
+    chunk_size: int = _STREAM_CHUNK,
+) -> None:
+    """Encrypt a file in chunks, overlapping disk reads, AES-GCM and writes.
+
+    Memory use is bounded by a few chunks regardless of the file size.
+
+    Args:
+        in_path: path to input file
+        out_path: path to output (encrypted) file
+        public_key_pem: public key in PEM format (bytes)
+        chunk_size: plaintext bytes per encrypted frame
+    """
+    if not 0 < chunk_size < _FINAL_BIT - 16:
+        raise ValueError(f"invalid chunk size: {chunk_size}")
+
+    header, aes_key, prefix = _new_session(
+        public_key_pem, magic=_STREAM_MAGIC, nonce_size=_STREAM_PREFIX_SIZE
+    )
+    aesgcm = AESGCM(aes_key)
+
+    with _replacing(out_path) as dst, open(in_path, "rb") as src, _mapped(src) as data:
+        dst.write(header)
+
+        def chunks():
+            # Always at least one frame, so empty input still gets a final frame.
+            # AESGCM only takes bytes before cryptography 41, so each slice is
+            # copied here, in the read stage, rather than passed as a view.
+            last = max(len(data) - 1, 0) // chunk_size
+            for index in range(last + 1):
+                yield index, bytes(data[index * chunk_size:(index + 1) * chunk_size]), index == last
+
+        def seal(item):
+            index, chunk, final = item
+            ct = aesgcm.encrypt(_frame_nonce(prefix, index), chunk, _frame_aad(final))
+            return _FRAME_HEADER.pack(len(ct) | (_FINAL_BIT if final else 0)), ct
+
+        await _run_pipeline(functools.partial(next, chunks(), None), seal, dst.writelines)
+
+
+async def decrypt_file_async(
+    in_path: str,
+    out_path: str,
+    private_key_pem: bytes,
+) -> None:
+    """Decrypt a file written by `encrypt_file`, overlapping I/O and AES-GCM.
+
+    Files produced by `encrypt_bytes` (e.g. the ComfyUI node's output) are
+    also accepted and decrypted in one piece. If decryption fails, out_path
+    is left untouched.
+
+    Args:
+        in_path: path to encrypted file
+        out_path: path to output (decrypted) file
+        private_key_pem: private key in PEM format (bytes)
+    """
+    with _replacing(out_path) as dst, open(in_path, "rb") as src, _mapped(src) as data:
+        if data[:len(_STREAM_MAGIC)] != _STREAM_MAGIC:
+            dst.write(decrypt_bytes(data, private_key_pem))
+            return
+
+        private_key = _load_private_key(bytes(private_key_pem))
+        offset = len(_STREAM_MAGIC)
+        encrypted_aes_key = bytes(data[offset:offset + private_key.key_size // 8])
+        offset += private_key.key_size // 8
+        prefix = bytes(data[offset:offset + _STREAM_PREFIX_SIZE])
+        offset += _STREAM_PREFIX_SIZE
+        if len(prefix) != _STREAM_PREFIX_SIZE:
+            raise ValueError("encrypted file is truncated")
+        aesgcm = AESGCM(private_key.decrypt(encrypted_aes_key, _OAEP))
+
+        def frames():
+            pos, index = offset, 0
+            while True:
+                if pos + _FRAME_HEADER.size > len(data):
+                    raise ValueError("encrypted file is truncated")
+                (word,) = _FRAME_HEADER.unpack_from(data, pos)
+                pos += _FRAME_HEADER.size
+                final = bool(word & _FINAL_BIT)
+                size = word & ~_FINAL_BIT
+                if pos + size > len(data):
+                    raise ValueError("encrypted file is truncated")
+                # bytes, not a view: see chunks() in encrypt_file_async
+                yield index, bytes(data[pos:pos + size]), final
+                pos += size
+                if final:
+                    if pos != len(data):
+                        raise ValueError("unexpected data after final frame")
+                    return
+                index += 1
+
+        def open_frame(item):
+            index, ct, final = item
+            return aesgcm.decrypt(_frame_nonce(prefix, index), ct, _frame_aad(final))
+
+        await _run_pipeline(functools.partial(next, frames(), None), open_frame, dst.write)
+
+
 def encrypt_file(
     in_path: str,
     out_path: str,
@@ -197,16 +623,15 @@ def encrypt_file(
 ) -> None:
     """Encrypt a file from disk and write encrypted bytes to out_path.
 
+    Synchronous wrapper around `encrypt_file_async`; must not be called from
+    a running event loop (await `encrypt_file_async` there instead).
+
     Args:
         in_path: path to input file
         out_path: path to output (encrypted) file
         public_key_pem: public key in PEM format (bytes)
     """
-    with open(in_path, "rb") as f:
-        data = f.read()
-    enc = encrypt_bytes(data, public_key_pem)
-    with open(out_path, "wb") as f:
-        f.write(enc)
+    asyncio.run(encrypt_file_async(in_path, out_path, public_key_pem))
 
 
 def decrypt_file(
@@ -216,13 +641,12 @@ def decrypt_file(
 ) -> None:
     """Decrypt a file from disk and write decrypted bytes to out_path.
 
+    Synchronous wrapper around `decrypt_file_async`; must not be called from
+    a running event loop (await `decrypt_file_async` there instead).
+
     Args:
         in_path: path to encrypted file
         out_path: path to output (decrypted) file
         private_key_pem: private key in PEM format (bytes)
     """
-    with open(in_path, "rb") as f:
-        enc_data = f.read()
-    data = decrypt_bytes(enc_data, private_key_pem)
-    with open(out_path, "wb") as f:
-        f.write(data)
+    asyncio.run(decrypt_file_async(in_path, out_path, private_key_pem))
@@ -0,0 +1,89 @@
+"""Shared pytest fixtures.
+
+RSA key generation (a prime search) dominates the cost of the crypto tests,
+so keypairs are generated once per session and shared by every test. Under
+pytest-xdist "session" means once per worker; use ``--dist loadfile`` so a
+test module's tests stay on one worker.
+"""
+
+import importlib
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the repo to path so we can import modules
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from rsa_encrypt import generate_rsa_keypair
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def pytest_configure(config):
+    # Keep tmp_path directories on tmpfs (RAM) where available: the file tests
+    # write a few bytes, so filesystem/journal overhead would dominate them.
+    # pytest's usual numbered pytest-of-<user>/pytest-N layout and cleanup are
+    # kept; set PYTEST_DEBUG_TEMPROOT yourself or pass --basetemp to override.
+    if sys.platform.startswith("linux") and os.access("/dev/shm", os.W_OK):
+        os.environ.setdefault("PYTEST_DEBUG_TEMPROOT", "/dev/shm")
+
+
+def _openssl_keypair(key_size):
+    """Generate (private_pem, public_pem) with the openssl CLI, or None if unavailable.
+
+    Uses $OPENSSL_BIN, else openssl from PATH. This also checks that keys
+    produced by OpenSSL itself load in rsa_encrypt.
+    """
+    openssl = os.environ.get("OPENSSL_BIN") or shutil.which("openssl")
+    if not openssl:
+        return None
+    try:
+        private_pem = subprocess.run(
+            [openssl, "genrsa", str(key_size)], capture_output=True, check=True
+        ).stdout
+        public_pem = subprocess.run(
+            [openssl, "rsa", "-pubout"], input=private_pem, capture_output=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return private_pem, public_pem
+
+
+@pytest.fixture(scope="session")
+def nodes():
+    """The package's nodes module, imported the way ComfyUI loads custom nodes.
+
+    nodes.py uses relative imports, so the repo directory is loaded as a
+    package (under a fixed name, since checkout directories often contain
+    dashes) rather than put on sys.path.
+    """
+    name = "comfyui_encrypt"
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            name, ROOT / "__init__.py", submodule_search_locations=[str(ROOT)]
+        )
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[name] = package
+        spec.loader.exec_module(package)
+    return importlib.import_module(f"{name}.nodes")
+
+
+@pytest.fixture(scope="session")
+def rsa_2048():
+    """(private_pem, public_pem) for a 2048-bit key, generated once per session."""
+    return _openssl_keypair(2048) or generate_rsa_keypair(key_size=2048)
+
+
+@pytest.fixture(scope="session")
+def rsa_4096_static():
+    """(private_pem, public_pem) for the checked-in test-only 4096-bit key."""
+    return (
+        (FIXTURES / "rsa4096_priv.pem").read_bytes(),
+        (FIXTURES / "rsa4096_pub.pem").read_bytes(),
+    )
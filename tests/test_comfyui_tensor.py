@@ -13,38 +13,30 @@ import os
 # Add the repo to path so we can import modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from rsa_encrypt import generate_rsa_keypair, encrypt_image, decrypt_image
+from rsa_encrypt import encrypt_image, decrypt_image
 
-def test_comfyui_tensor_image():
+def test_comfyui_tensor_image(nodes, rsa_2048):
     """Test with a simulated ComfyUI Tensor (float32, [0-1])."""
     print("=" * 60)
     print("Test 1: ComfyUI Tensor (float32, [0-1])")
     print("=" * 60)
     
-    # Generate keypair
-    private_pem, public_pem = generate_rsa_keypair(key_size=2048)
+    # Shared session keypair (tests/conftest.py)
+    private_pem, public_pem = rsa_2048
     
     # Create a simulated ComfyUI Tensor image
     # ComfyUI typically passes (batch, height, width, channels) with float32 in [0, 1]
     tensor = torch.rand(1, 256, 256, 3, dtype=torch.float32)
     print(f"Input Tensor shape: {tensor.shape}, dtype: {tensor.dtype}")
     
-    # Simulate the conversion logic from nodes.py
-    arr = tensor.numpy()
-    print(f"After .numpy(): shape {arr.shape}, dtype {arr.dtype}, min {arr.min():.3f}, max {arr.max():.3f}")
-    
-    # Convert float to uint8
-    arr = np.clip(arr * 255, 0, 255).astype(np.uint8)
+    # Run the node's own conversion: a uint8 (batch, height, width, channels) array
+    arr = nodes._to_uint8_hwc(tensor)
     print(f"After float->uint8: shape {arr.shape}, dtype {arr.dtype}, min {arr.min()}, max {arr.max()}")
+    assert arr.shape == (1, 256, 256, 3)
+    assert np.array_equal(arr, np.clip(tensor.numpy() * 255, 0, 255).astype(np.uint8))
     
-    # Remove batch dimension if present
-    if len(arr.shape) == 4:
-        print(f"Removing batch dimension from shape {arr.shape}")
-        arr = arr[0]
-        print(f"New shape after removing batch: {arr.shape}")
-    
-    # Convert to PIL Image (assuming 3 channels = RGB)
-    pil_img = Image.fromarray(arr, mode='RGB')
+    # Convert the first batch image to PIL Image (3 channels = RGB)
+    pil_img = Image.fromarray(arr[0], mode='RGB')
     print(f"PIL Image: size {pil_img.size}, mode {pil_img.mode}")
     
     # Encrypt
@@ -61,13 +53,13 @@ def test_comfyui_tensor_image():
     print("✓ Tensor conversion test PASSED")
     print()
 
-def test_numpy_array_image():
+def test_numpy_array_image(rsa_2048):
     """Test with a numpy array."""
     print("=" * 60)
     print("Test 2: Numpy array (uint8)")
     print("=" * 60)
     
-    private_pem, public_pem = generate_rsa_keypair(key_size=2048)
+    private_pem, public_pem = rsa_2048
     
     # Create a simple numpy array
     arr = np.random.randint(0, 256, (256, 256, 3), dtype=np.uint8)
@@ -85,13 +77,13 @@ def test_numpy_array_image():
     print("✓ Numpy array test PASSED")
     print()
 
-def test_pil_image():
+def test_pil_image(rsa_2048):
     """Test with a PIL Image directly."""
     print("=" * 60)
     print("Test 3: PIL Image")
     print("=" * 60)
     
-    private_pem, public_pem = generate_rsa_keypair(key_size=2048)
+    private_pem, public_pem = rsa_2048
     
     # Create PIL image
     pil_img = Image.new('RGB', (256, 256), color=(73, 109, 137))
@@ -109,19 +101,6 @@ def test_pil_image():
     print()
 
 if __name__ == "__main__":
-    try:
-        test_comfyui_tensor_image()
-        test_numpy_array_image()
-        test_pil_image()
-        print("=" * 60)
-        print("All tests PASSED! ✓")
-        print("=" * 60)
-    except ImportError as e:
-        print(f"ImportError: {e}")
-        print("Make sure torch is installed: pip install torch")
-        sys.exit(1)
-    except Exception as e:
-        print(f"ERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+    # The tests use fixtures from conftest.py, so run them through pytest
+    import pytest
+    sys.exit(pytest.main([__file__, "-s"]))
@@ -0,0 +1,128 @@
+"""Tests for the ComfyUI nodes in nodes.py."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from rsa_encrypt import decrypt_image
+
+
+def _batch(n, height=6, width=5):
+    """A ComfyUI-style IMAGE batch: float32 in [0, 1], shape (n, h, w, 3)."""
+    return np.random.default_rng(n).random((n, height, width, 3), dtype=np.float32)
+
+
+def _expected(batch):
+    return np.clip(batch * 255, 0, 255).astype(np.uint8)
+
+
+def _decrypt_paths(file_paths, private_pem):
+    return [decrypt_image(Path(path).read_bytes(), private_pem) for path in file_paths.split("\n")]
+
+
+def test_encrypt_node_batch_default_names(nodes, rsa_2048, tmp_path, monkeypatch):
+    """Test that every image of a batch gets its own mkstemp-named file in cwd."""
+    private_pem, public_pem = rsa_2048
+    monkeypatch.chdir(tmp_path)
+
+    batch = _batch(3)
+    (file_paths,) = nodes.RSAEncryptNode().encrypt(batch, public_pem.decode())
+
+    paths = file_paths.split("\n")
+    assert len(paths) == 3
+    for path in map(Path, paths):
+        assert path.parent == tmp_path
+        assert path.name.startswith("encrypted_image_")
+        assert path.suffix == ".rsa"
+    for img, expected in zip(_decrypt_paths(file_paths, private_pem), _expected(batch)):
+        assert np.array_equal(np.asarray(img), expected)
+
+
+def test_encrypt_node_batch_out_path(nodes, rsa_2048, tmp_path):
+    """Test that an explicit out_path gets an index suffix per batch image."""
+    private_pem, public_pem = rsa_2048
+
+    batch = _batch(3)
+    (file_paths,) = nodes.RSAEncryptNode().encrypt(
+        batch, public_pem.decode(), out_path=str(tmp_path / "out.rsa"), format="png"
+    )
+
+    assert file_paths.split("\n") == [str(tmp_path / f"out_{i}.rsa") for i in range(3)]
+    for img, expected in zip(_decrypt_paths(file_paths, private_pem), _expected(batch)):
+        assert np.array_equal(np.asarray(img), expected)
+
+
+def test_encrypt_node_pil_input(nodes, rsa_2048, tmp_path):
+    """Test encrypting a PIL Image input to a single file."""
+    private_pem, public_pem = rsa_2048
+
+    img = Image.new("RGBA", (4, 3), color=(1, 2, 3, 4))
+    (file_path,) = nodes.RSAEncryptNode().encrypt(img, public_pem.decode(), out_path=str(tmp_path / "pil.rsa"))
+
+    assert file_path == str(tmp_path / "pil.rsa")
+    (decrypted,) = _decrypt_paths(file_path, private_pem)
+    assert decrypted.mode == "RGBA"
+    assert decrypted.tobytes() == img.tobytes()
+
+
+@pytest.mark.parametrize("format", ["raw", "png"])
+def test_encrypt_node_strided_uint8(nodes, rsa_2048, tmp_path, format):
+    """Test a non-contiguous uint8 view (channels reversed) is encrypted as its pixels."""
+    private_pem, public_pem = rsa_2048
+
+    batch = np.arange(2 * 6 * 5 * 3, dtype=np.uint8).reshape(2, 6, 5, 3)[..., ::-1]
+    (file_paths,) = nodes.RSAEncryptNode().encrypt(
+        batch, public_pem.decode(), out_path=str(tmp_path / "s.rsa"), format=format
+    )
+
+    for img, expected in zip(_decrypt_paths(file_paths, private_pem), batch):
+        assert np.array_equal(np.asarray(img), expected)
+
+
+@pytest.mark.parametrize("dtype", [np.float16, np.float32, np.float64])
+def test_encrypt_node_float_dtypes(nodes, rsa_2048, tmp_path, dtype):
+    """Test that every floating dtype is scaled to uint8 before packing."""
+    private_pem, public_pem = rsa_2048
+
+    batch = _batch(1).astype(dtype)
+    (file_path,) = nodes.RSAEncryptNode().encrypt(batch, public_pem.decode(), out_path=str(tmp_path / "f.rsa"))
+
+    (decrypted,) = _decrypt_paths(file_path, private_pem)
+    assert np.array_equal(np.asarray(decrypted), _expected(batch)[0])
+
+
+@pytest.mark.parametrize("format", ["raw", "png"])
+@pytest.mark.parametrize("dtype", [np.int64, np.uint16, np.bool_])
+def test_encrypt_node_rejects_other_dtypes(nodes, rsa_2048, tmp_path, dtype, format):
+    """Test that arrays neither uint8 nor floating are rejected instead of packed as bytes."""
+    _, public_pem = rsa_2048
+
+    batch = np.full((1, 2, 3, 3), 7, dtype=dtype)
+    with pytest.raises(ValueError, match="Cannot handle this data type"):
+        nodes.RSAEncryptNode().encrypt(batch, public_pem.decode(), out_path=str(tmp_path / "x.rsa"), format=format)
+    assert not (tmp_path / "x.rsa").exists()
+
+
+@pytest.mark.parametrize("format", ["raw", "png"])
+def test_encrypt_one_requires_uint8(nodes, rsa_2048, format):
+    """Test that a non-uint8 buffer is never wrapped or packed as pixels."""
+    _, public_pem = rsa_2048
+
+    with pytest.raises(TypeError, match="Cannot handle this data type"):
+        nodes._encrypt_one(np.full((3, 1, 3), 7, dtype=np.int64), public_pem, format)
+
+
+def test_key_generator_reuse(nodes, monkeypatch):
+    """Test that reuse=True returns the previously generated keypair."""
+    generated = iter([(b"priv-1", b"pub-1"), (b"priv-2", b"pub-2"), (b"priv-3", b"pub-3")])
+    monkeypatch.setattr(nodes, "generate_rsa_keypair", lambda key_size: next(generated))
+    monkeypatch.setattr(nodes, "_key_cache", {})
+    node = nodes.RSAKeyGeneratorNode()
+
+    assert node.generate("2048") == ("priv-1", "pub-1")
+    assert node.generate("2048", reuse=True) == ("priv-1", "pub-1")
+    assert node.generate("4096", reuse=True) == ("priv-2", "pub-2")
+    assert node.generate("2048") == ("priv-3", "pub-3")
+    assert node.generate("2048", reuse=True) == ("priv-3", "pub-3")
@@ -1,19 +1,27 @@
 """Unit tests for RSA encryption functions."""
 
 import os
-from pathlib import Path
 import pytest
 from PIL import Image
-import io
+import asyncio
+import logging
+import uuid
+import warnings
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+import rsa_encrypt
 from rsa_encrypt import (
     generate_rsa_keypair,
     encrypt_bytes,
     decrypt_bytes,
     encrypt_image,
     decrypt_image,
+    encrypt_image_raw,
+    decrypt_image_raw,
     encrypt_file,
     decrypt_file,
+    encrypt_file_async,
 )
 
 
@@ -26,26 +34,78 @@ def test_generate_keypair():
     assert b"BEGIN PUBLIC KEY" in public_pem
 
 
-def test_encrypt_decrypt_bytes():
-    """Test encrypting and decrypting raw bytes."""
-    private_pem, public_pem = generate_rsa_keypair(key_size=2048)
+@pytest.fixture(scope="module")
+def shared_tmp(tmp_path_factory):
+    """One directory for all file roundtrips in this module; tests pick unique names."""
+    return tmp_path_factory.mktemp("rsa")
 
-    original = b"Hello, RSA encryption!"
-    encrypted = encrypt_bytes(original, public_pem)
 
-    assert encrypted != original
+def _roundtrip_bytes(payload, keys, directory):
+    private_pem, public_pem = keys
+    encrypted = encrypt_bytes(payload, public_pem)
+
+    assert encrypted != payload
     assert isinstance(encrypted, bytes)
 
-    decrypted = decrypt_bytes(encrypted, private_pem)
-    assert decrypted == original
+    return decrypt_bytes(encrypted, private_pem)
+
+
+def _roundtrip_file(payload, keys, directory):
+    private_pem, public_pem = keys
+    name = uuid.uuid4().hex
+    input_file = directory / f"{name}_input.bin"
+    output_file = directory / f"{name}_encrypted.rsa"
+    decrypted_file = directory / f"{name}_decrypted.bin"
+    input_file.write_bytes(payload)
+
+    encrypt_file(str(input_file), str(output_file), public_pem)
+    assert output_file.exists()
+
+    decrypt_file(str(output_file), str(decrypted_file), private_pem)
+    assert decrypted_file.exists()
+
+    return decrypted_file.read_bytes()
+
+
+_ROUNDTRIPS = {"bytes": _roundtrip_bytes, "file": _roundtrip_file}
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [b"", b"x", b"Hello, RSA encryption!", os.urandom(100)],
+    ids=["empty", "one-byte", "text", "random-100"],
+)
+@pytest.mark.parametrize("kind", sorted(_ROUNDTRIPS))
+def test_roundtrip(rsa_2048, shared_tmp, kind, payload):
+    """Test encrypting and decrypting payloads of several sizes, in memory and via files."""
+    assert _ROUNDTRIPS[kind](payload, rsa_2048, shared_tmp) == payload
 
 
-def test_encrypt_decrypt_image():
+def test_decrypt_rejects_tampered_data(rsa_2048):
+    """Test that modified ciphertext fails authentication."""
+    private_pem, public_pem = rsa_2048
+
+    encrypted = bytearray(encrypt_bytes(b"integrity matters", public_pem))
+    encrypted[-1] ^= 0x01
+
+    with pytest.raises(InvalidTag):
+        decrypt_bytes(bytes(encrypted), private_pem)
+
+    with pytest.raises(ValueError):
+        decrypt_bytes(b"not an encrypted payload", private_pem)
+
+
+@pytest.mark.parametrize(
+    "size",
+    [(2, 2), pytest.param((512, 512), marks=pytest.mark.slow)],
+    ids=["tiny", "512"],
+)
+def test_encrypt_decrypt_image(rsa_2048, size):
     """Test encrypting and decrypting a PIL Image."""
-    private_pem, public_pem = generate_rsa_keypair(key_size=2048)
+    private_pem, public_pem = rsa_2048
 
-    # Create a small test image
-    img = Image.new("RGB", (100, 100), color="red")
+    # Create a test image; the 512x512 case pushes a larger payload through the pipeline
+    img = Image.new("RGB", size, color="red")
 
     # Encrypt
     encrypted = encrypt_image(img, public_pem)
@@ -55,37 +115,159 @@ def test_encrypt_decrypt_image():
     # Decrypt
     decrypted_img = decrypt_image(encrypted, private_pem)
     assert isinstance(decrypted_img, Image.Image)
-    assert decrypted_img.size == (100, 100)
+    assert decrypted_img.size == size
 
 
-def test_encrypt_file_decrypt_file(tmp_path):
-    """Test file encryption and decryption."""
-    private_pem, public_pem = generate_rsa_keypair(key_size=2048)
+def test_encrypt_decrypt_image_raw(rsa_2048):
+    """Test the raw pixel format roundtrip."""
+    private_pem, public_pem = rsa_2048
+
+    img = Image.new("RGBA", (64, 32), color=(10, 20, 30, 40))
+
+    encrypted = encrypt_image_raw(img, public_pem)
+    for decrypt in (decrypt_image_raw, decrypt_image):
+        decrypted_img = decrypt(encrypted, private_pem)
+
+        assert decrypted_img.mode == "RGBA"
+        assert decrypted_img.size == (64, 32)
+        assert decrypted_img.tobytes() == img.tobytes()
+
+    with pytest.raises(ValueError):
+        decrypt_image_raw(encrypt_image(img, public_pem), private_pem)
+
+
+def test_encrypt_decrypt_image_bmp(rsa_2048):
+    """Test the uncompressed BMP format roundtrip."""
+    private_pem, public_pem = rsa_2048
+
+    img = Image.new("RGB", (30, 20), color=(1, 2, 3))
+
+    encrypted = encrypt_image(img, public_pem, format="bmp")
+    decrypted_img = decrypt_image(encrypted, private_pem)
+
+    assert decrypted_img.format == "BMP"
+    assert decrypted_img.tobytes() == img.tobytes()
 
-    # Create a test file
-    input_file = tmp_path / "test_input.txt"
-    output_file = tmp_path / "test_encrypted.rsa"
-    decrypted_file = tmp_path / "test_decrypted.txt"
 
-    test_data = b"Secret message for file encryption"
+def test_pillow_simd_hint_is_logged_once(rsa_2048, caplog, monkeypatch):
+    """Test that the Pillow-SIMD hint goes to the log once instead of raising a warning."""
+    _, public_pem = rsa_2048
+    monkeypatch.setattr(rsa_encrypt.PIL, "__version__", "10.0.0")
+    rsa_encrypt._check_pillow_simd.cache_clear()
+
+    img = Image.new("RGB", (2, 2))
+    with warnings.catch_warnings(), caplog.at_level(logging.INFO, logger="comfyui_encrypt"):
+        warnings.simplefilter("error")
+        encrypt_image(img, public_pem, format="png")
+        encrypt_image(img, public_pem, format="bmp")
+
+    assert [r.levelno for r in caplog.records if "Pillow-SIMD" in r.getMessage()] == [logging.INFO]
+
+
+def test_encrypt_file_multiple_frames(rsa_2048, tmp_path):
+    """Test chunked file encryption across several frames, and truncation detection."""
+    private_pem, public_pem = rsa_2048
+
+    input_file = tmp_path / "input.bin"
+    output_file = tmp_path / "encrypted.rsa"
+    decrypted_file = tmp_path / "decrypted.bin"
+
+    test_data = os.urandom(1000)
     input_file.write_bytes(test_data)
 
-    # Encrypt
-    encrypt_file(str(input_file), str(output_file), public_pem)
-    assert output_file.exists()
+    asyncio.run(encrypt_file_async(str(input_file), str(output_file), public_pem, chunk_size=64))
+    decrypt_file(str(output_file), str(decrypted_file), private_pem)
+    assert decrypted_file.read_bytes() == test_data
 
-    # Decrypt
+    # Dropping the final frame must not go unnoticed, nor clobber the old output
+    output_file.write_bytes(output_file.read_bytes()[:-100])
+    with pytest.raises(ValueError):
+        decrypt_file(str(output_file), str(decrypted_file), private_pem)
+    assert decrypted_file.read_bytes() == test_data
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["decrypted.bin", "encrypted.rsa", "input.bin"]
+
+
+@pytest.mark.parametrize("size", [10, 100_000], ids=["small", "100k"])
+def test_encrypt_file_in_place(rsa_2048, tmp_path, size):
+    """Test encrypting and decrypting a file onto itself."""
+    private_pem, public_pem = rsa_2048
+
+    path = tmp_path / "data.bin"
+    test_data = os.urandom(size)
+    path.write_bytes(test_data)
+
+    encrypt_file(str(path), str(path), public_pem)
+    assert path.read_bytes() != test_data
+
+    decrypt_file(str(path), str(path), private_pem)
+    assert path.read_bytes() == test_data
+
+    # Same for the single-shot layout written by encrypt_bytes
+    path.write_bytes(encrypt_bytes(test_data, public_pem))
+    decrypt_file(str(path), str(path), private_pem)
+    assert path.read_bytes() == test_data
+    assert [p.name for p in tmp_path.iterdir()] == ["data.bin"]
+
+
+class _BytesOnlyAESGCM:
+    """AESGCM as in cryptography < 41 (requirements.txt allows 3.4.8): data must be bytes."""
+
+    def __init__(self, key):
+        self._aesgcm = AESGCM(key)
+
+    def encrypt(self, nonce, data, associated_data):
+        if not isinstance(data, bytes):
+            raise TypeError("data must be bytes")
+        return self._aesgcm.encrypt(nonce, data, associated_data)
+
+    def decrypt(self, nonce, data, associated_data):
+        if not isinstance(data, bytes):
+            raise TypeError("data must be bytes")
+        return self._aesgcm.decrypt(nonce, data, associated_data)
+
+
+@pytest.mark.parametrize("size", [10, 100_000], ids=["small", "100k"])
+def test_encrypt_file_with_bytes_only_aesgcm(rsa_2048, tmp_path, monkeypatch, size):
+    """Test the file pipeline against the AESGCM API of the minimum cryptography version."""
+    private_pem, public_pem = rsa_2048
+    monkeypatch.setattr(rsa_encrypt, "AESGCM", _BytesOnlyAESGCM)
+
+    input_file = tmp_path / "input.bin"
+    output_file = tmp_path / "encrypted.rsa"
+    decrypted_file = tmp_path / "decrypted.bin"
+    test_data = os.urandom(size)
+    input_file.write_bytes(test_data)
+
+    asyncio.run(encrypt_file_async(str(input_file), str(output_file), public_pem, chunk_size=4096))
     decrypt_file(str(output_file), str(decrypted_file), private_pem)
-    assert decrypted_file.exists()
+    assert decrypted_file.read_bytes() == test_data
 
-    result = decrypted_file.read_bytes()
-    assert result == test_data
 
+def test_decrypt_file_accepts_encrypt_bytes_output(rsa_2048, tmp_path):
+    """Test decrypt_file on data written by encrypt_bytes (the node's output format)."""
+    private_pem, public_pem = rsa_2048
 
-def test_larger_key_size():
-    """Test with RSA-4096 key."""
+    encrypted_file = tmp_path / "node_output.rsa"
+    decrypted_file = tmp_path / "decrypted.bin"
+    encrypted_file.write_bytes(encrypt_bytes(b"written by the node", public_pem))
+
+    decrypt_file(str(encrypted_file), str(decrypted_file), private_pem)
+    assert decrypted_file.read_bytes() == b"written by the node"
+
+
+@pytest.mark.slow
+def test_generate_keypair_4096():
+    """Test RSA-4096 keypair generation end to end."""
     private_pem, public_pem = generate_rsa_keypair(key_size=4096)
 
+    encrypted = encrypt_bytes(b"fresh 4096-bit key", public_pem)
+    assert decrypt_bytes(encrypted, private_pem) == b"fresh 4096-bit key"
+
+
+def test_larger_key_size(rsa_4096_static):
+    """Test with RSA-4096 key."""
+    private_pem, public_pem = rsa_4096_static
+
     original = b"Testing with larger RSA-4096 key"
     encrypted = encrypt_bytes(original, public_pem)
     decrypted = decrypt_bytes(encrypted, private_pem)